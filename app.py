@@ -1,16 +1,18 @@
 # app.py
 from flask import Flask, request, jsonify
+from flask.json.provider import JSONProvider
 import logging
-import hashlib
+import atexit
 import hmac
-import json
-from datetime import datetime
-import threading
-import schedule
+import orjson
 import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from apscheduler.schedulers.background import BackgroundScheduler
 
 from config import Config
-from src.clients.odoo_client import OdooClient
+from src.clients.odoo_client import OdooJsonRpcClient
 from src.clients.woo_client import WooCommerceClient
 from src.services.sync_service import SyncService
 from src.utils.logger import setup_logger
@@ -19,8 +21,18 @@ from src.utils.logger import setup_logger
 setup_logger()
 logger = logging.getLogger(__name__)
 
+class OrjsonProvider(JSONProvider):
+    """Proveedor JSON basado en orjson (serialización nativa, más rápida que stdlib)"""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 # Crear Flask app
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 app.config.from_object(Config)
 
 # Validar configuración
@@ -31,44 +43,67 @@ except ValueError as e:
     logger.error(f"Error en configuración: {e}")
     exit(1)
 
-# Inicializar clientes
-odoo_client = OdooClient()
+# Inicializar clientes (JSON-RPC: marshalling más liviano que XML-RPC)
+odoo_client = OdooJsonRpcClient()
 woo_client = WooCommerceClient()
 sync_service = SyncService(odoo_client, woo_client)
 
+# Pool acotado para procesar webhooks (evita crear un hilo por request)
+executor = ThreadPoolExecutor(max_workers=Config.SYNC_WORKERS, thread_name_prefix='sync')
+atexit.register(executor.shutdown)
+
+# Valores de Config resueltos una sola vez para los caminos calientes
+# (evita el lookup de atributo de clase por request)
+_ENV = Config.ENVIRONMENT
+
+# Clave del webhook precomputada en bytes (evita encode por request)
+_WEBHOOK_KEY = (Config.WEBHOOK_SECRET or '').encode('utf-8')
+
+# Cache del timestamp ISO con resolución de segundo (evita construir
+# un datetime + isoformat por request)
+_timestamp_cache = {'t': 0, 's': ''}
+
+def _iso_timestamp() -> str:
+    """Timestamp ISO actual, reutilizado dentro del mismo segundo"""
+    now = int(time.time())
+    if now != _timestamp_cache['t']:
+        _timestamp_cache['t'] = now
+        _timestamp_cache['s'] = datetime.fromtimestamp(now).isoformat()
+    return _timestamp_cache['s']
+
 def verify_webhook_signature(payload: bytes, signature: str) -> bool:
     """Verificar firma del webhook para seguridad"""
-    if not Config.WEBHOOK_SECRET:
+    if not _WEBHOOK_KEY:
         logger.warning("WEBHOOK_SECRET no configurado - saltando verificación")
         return True
-    
-    expected_signature = hmac.new(
-        Config.WEBHOOK_SECRET.encode('utf-8'),
-        payload,
-        hashlib.sha256
-    ).hexdigest()
-    
-    return hmac.compare_digest(f"sha256={expected_signature}", signature)
+
+    # hmac.digest con el nombre 'sha256' usa el one-shot de OpenSSL
+    # (acelerado por hardware en CPUs con SHA-NI)
+    mac = hmac.digest(_WEBHOOK_KEY, payload, 'sha256')
+    expected = b'sha256=' + mac.hex().encode('ascii')
+    provided = signature.encode('ascii') if isinstance(signature, str) else signature
+
+    return hmac.compare_digest(expected, provided)
 
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
     try:
-        # Verificar conexión a Odoo
-        odoo_status = odoo_client.authenticate()
-        
+        # Verificar conexión a Odoo (usa la sesión cacheada, re-autentica solo si venció)
+        odoo_status = odoo_client._ensure_auth()
+
         return jsonify({
             'status': 'healthy',
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': _iso_timestamp(),
             'odoo_connection': odoo_status,
-            'environment': Config.ENVIRONMENT
+            'environment': _ENV
         }), 200
     except Exception as e:
         logger.error(f"Health check failed: {e}")
         return jsonify({
             'status': 'unhealthy',
             'error': str(e),
-            'timestamp': datetime.now().isoformat()
+            'timestamp': _iso_timestamp()
         }), 500
 
 @app.route('/webhook/order', methods=['POST'])
@@ -81,19 +116,19 @@ def webhook_order():
             logger.warning("Webhook signature verification failed")
             return jsonify({'error': 'Invalid signature'}), 403
         
-        # Obtener datos de la orden
-        order_data = request.get_json()
-        
+        # Obtener datos de la orden (orjson parsea los bytes crudos directamente)
+        try:
+            order_data = orjson.loads(request.data) if request.data else None
+        except orjson.JSONDecodeError:
+            return jsonify({'error': 'Invalid JSON payload'}), 400
+
         if not order_data:
             return jsonify({'error': 'No data provided'}), 400
         
         logger.info(f"Recibida orden #{order_data.get('number', 'unknown')}")
         
         # Procesar orden de forma asíncrona
-        threading.Thread(
-            target=sync_service.process_woo_order,
-            args=(order_data,)
-        ).start()
+        executor.submit(sync_service.process_woo_order, order_data)
         
         return jsonify({
             'status': 'success',
@@ -112,18 +147,18 @@ def webhook_customer():
         if not verify_webhook_signature(request.data, signature):
             return jsonify({'error': 'Invalid signature'}), 403
         
-        customer_data = request.get_json()
-        
+        try:
+            customer_data = orjson.loads(request.data) if request.data else None
+        except orjson.JSONDecodeError:
+            return jsonify({'error': 'Invalid JSON payload'}), 400
+
         if not customer_data:
             return jsonify({'error': 'No data provided'}), 400
         
         logger.info(f"Recibido cliente: {customer_data.get('email', 'unknown')}")
         
         # Procesar cliente
-        threading.Thread(
-            target=sync_service.process_woo_customer,
-            args=(customer_data,)
-        ).start()
+        executor.submit(sync_service.process_woo_customer, customer_data)
         
         return jsonify({
             'status': 'success',
@@ -144,9 +179,8 @@ def manual_sync():
         logger.info(f"Iniciando sincronización manual: {sync_type}")
         
         if sync_type in ['all', 'orders']:
-            # Sincronizar órdenes recientes
-            bookings = woo_client.get_recent_bookings(hours=hours)
-            for booking in bookings:
+            # Sincronizar órdenes recientes (streaming, sin materializar la lista)
+            for booking in woo_client.iter_recent_bookings(hours=hours):
                 sync_service.sync_booking_to_odoo(booking)
         
         if sync_type in ['all', 'customers']:
@@ -174,41 +208,42 @@ def sync_status():
         return jsonify({
             'status': 'active',
             'recent_bookings_count': len(recent_bookings),
-            'last_check': datetime.now().isoformat(),
-            'environment': Config.ENVIRONMENT
+            'last_check': _iso_timestamp(),
+            'environment': _ENV
         }), 200
         
     except Exception as e:
         logger.error(f"Error getting sync status: {e}")
         return jsonify({'error': str(e)}), 500
 
-def run_scheduler():
-    """Ejecutar tareas programadas en un hilo separado"""
+def start_scheduler():
+    """Programar tareas periódicas (disparo por eventos, sin polling)"""
     logger.info("Iniciando scheduler")
-    
-    # Programar sincronización periódica
-    schedule.every(Config.SYNC_INTERVAL).seconds.do(sync_service.scheduled_sync)
-    
-    # Programar limpieza de logs (diaria)
-    schedule.every().day.at("02:00").do(sync_service.cleanup_logs)
-    
-    while True:
-        schedule.run_pending()
-        time.sleep(60)  # Revisar cada minuto
+
+    scheduler = BackgroundScheduler()
+
+    # Sincronización periódica
+    scheduler.add_job(sync_service.scheduled_sync, 'interval', seconds=Config.SYNC_INTERVAL)
+
+    # Limpieza de logs (diaria)
+    scheduler.add_job(sync_service.cleanup_logs, 'cron', hour=2)
+
+    scheduler.start()
+    atexit.register(scheduler.shutdown)
+    return scheduler
 
 if __name__ == '__main__':
     logger.info(f"Iniciando aplicación en modo {Config.ENVIRONMENT}")
-    
+
     # Probar conexiones
     if odoo_client.authenticate():
         logger.info("✅ Conexión a Odoo exitosa")
     else:
         logger.error("❌ Error conectando a Odoo")
-    
-    # Iniciar scheduler en hilo separado
-    scheduler_thread = threading.Thread(target=run_scheduler, daemon=True)
-    scheduler_thread.start()
-    
+
+    # Iniciar scheduler de tareas programadas
+    start_scheduler()
+
     # Iniciar Flask app
     app.run(
         host=Config.HOST,
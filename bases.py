@@ -5,6 +5,7 @@ Prueba nombres comunes de bases de datos en Odoo
 
 import xmlrpc.client
 import os
+from concurrent.futures import ThreadPoolExecutor
 
 # Configuración
 ODOO_URL = "http://15.235.35.248:8010"
@@ -36,6 +37,7 @@ COMMON_DB_NAMES = [
 def test_database_name(db_name):
     """Prueba si una base de datos existe y se puede autenticar"""
     try:
+        # Cada worker usa su propio proxy (ServerProxy no es thread-safe)
         common = xmlrpc.client.ServerProxy(f'{ODOO_URL}/xmlrpc/2/common')
         
         # Intentar autenticación
@@ -61,13 +63,14 @@ def find_correct_database():
     print("=" * 60)
     
     found_databases = []
-    
-    for db_name in COMMON_DB_NAMES:
-        print(f"Probando: {db_name:<20} ... ", end="", flush=True)
-        
-        success, message = test_database_name(db_name)
-        print(message)
-        
+
+    # Probar todas las bases en paralelo (trabajo puramente I/O-bound)
+    with ThreadPoolExecutor(max_workers=len(COMMON_DB_NAMES)) as executor:
+        results = executor.map(test_database_name, COMMON_DB_NAMES)
+
+    for db_name, (success, message) in zip(COMMON_DB_NAMES, results):
+        print(f"Probando: {db_name:<20} ... {message}")
+
         if success:
             found_databases.append(db_name)
     
@@ -30,6 +30,7 @@ class Config:
     # Sync Configuration
     SYNC_INTERVAL = int(os.getenv('SYNC_INTERVAL', 300))  # segundos
     BATCH_SIZE = int(os.getenv('BATCH_SIZE', 50))
+    SYNC_WORKERS = int(os.getenv('SYNC_WORKERS', 32))  # hilos para procesar webhooks
     
     # Logging
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
@@ -1,8 +1,72 @@
 import xmlrpc.client
+import itertools
 import logging
+import threading
+import time
 from typing import Dict, List, Optional, Any
+
+import orjson
+import requests
+from requests.adapters import HTTPAdapter
+
 from config import Config
 
+class _TTLCache:
+    """Cache simple con expiración por entrada (thread-safe)"""
+
+    def __init__(self, maxsize: int = 2048, ttl: int = 300):
+        self._data = {}
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._lock = threading.Lock()
+
+    def get(self, key) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key, value) -> None:
+        with self._lock:
+            if len(self._data) >= self._maxsize:
+                # Descartar la entrada más antigua (orden de inserción)
+                self._data.pop(next(iter(self._data)))
+            self._data[key] = (value, time.monotonic() + self._ttl)
+
+    def invalidate(self, key) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+class KeepAliveTransport(xmlrpc.client.Transport):
+    """Transport XML-RPC que reutiliza la conexión HTTP entre llamadas"""
+
+    def __init__(self):
+        super().__init__()
+        self._extra_headers = [('Connection', 'keep-alive')]
+
+    def make_connection(self, host):
+        # Reutilizar la conexión cacheada mientras el host no cambie
+        if self._connection and host == self._connection[0]:
+            return self._connection[1]
+        return super().make_connection(host)
+
+class KeepAliveSafeTransport(xmlrpc.client.SafeTransport):
+    """Variante HTTPS de KeepAliveTransport"""
+
+    def __init__(self):
+        super().__init__()
+        self._extra_headers = [('Connection', 'keep-alive')]
+
+    def make_connection(self, host):
+        if self._connection and host == self._connection[0]:
+            return self._connection[1]
+        return super().make_connection(host)
+
 class OdooClient:
     def __init__(self):
         self.url = Config.ODOO_URL
@@ -10,16 +74,29 @@ class OdooClient:
         self.username = Config.ODOO_USERNAME
         self.api_key = Config.ODOO_API_KEY
         self.uid = None
+        self._auth_ts = 0.0
+        self._auth_lock = threading.Lock()
         self.logger = logging.getLogger(__name__)
-        
-        # Conexiones XML-RPC
-        self.common = xmlrpc.client.ServerProxy(f'{self.url}/xmlrpc/2/common')
-        self.models = xmlrpc.client.ServerProxy(f'{self.url}/xmlrpc/2/object')
+
+        # Caches TTL para lookups repetidos (mismo id externo / cliente
+        # resuelto varias veces dentro de un lote o entre webhooks)
+        self._external_id_cache = _TTLCache(maxsize=2048, ttl=300)
+        self._customer_cache = _TTLCache(maxsize=2048, ttl=300)
+
+        # Conexiones XML-RPC compartiendo una sola conexión TCP persistente
+        if self.url and self.url.startswith('https'):
+            self.transport = KeepAliveSafeTransport()
+        else:
+            self.transport = KeepAliveTransport()
+        self.common = xmlrpc.client.ServerProxy(f'{self.url}/xmlrpc/2/common', transport=self.transport)
+        self.models = xmlrpc.client.ServerProxy(f'{self.url}/xmlrpc/2/object', transport=self.transport)
         
     def authenticate(self) -> bool:
         """Autenticar con Odoo y obtener UID"""
         try:
-            self.uid = self.common.authenticate(self.db, self.username, self.api_key, {})
+            # authenticate devuelve False (no una excepción) con credenciales
+            # malas; normalizar a None para que los chequeos de uid funcionen
+            self.uid = self.common.authenticate(self.db, self.username, self.api_key, {}) or None
             if self.uid:
                 self.logger.info(f"Autenticado exitosamente en Odoo con UID: {self.uid}")
                 return True
@@ -29,34 +106,55 @@ class OdooClient:
         except Exception as e:
             self.logger.error(f"Error de autenticación en Odoo: {e}")
             return False
-    
+
+    def _ensure_auth(self, ttl: int = 1800) -> bool:
+        """Autenticar solo si no hay UID o la sesión está vencida (thread-safe)"""
+        with self._auth_lock:
+            if not self.uid or time.monotonic() - self._auth_ts > ttl:
+                if self.authenticate():
+                    self._auth_ts = time.monotonic()
+            return self.uid is not None
+
+    def _execute_kw(self, model: str, method: str, args: List, kwargs: Dict = None):
+        """Ejecutar un método de modelo vía RPC (punto único de transporte)"""
+        return self.models.execute_kw(
+            self.db, self.uid, self.api_key,
+            model, method, args, kwargs or {}
+        )
+
     def create_record(self, model: str, data: Dict) -> Optional[int]:
         """Crear un registro en Odoo"""
         try:
-            if not self.uid:
-                self.authenticate()
+            self._ensure_auth()
             
-            record_id = self.models.execute_kw(
-                self.db, self.uid, self.api_key,
-                model, 'create', [data]
-            )
-            self.logger.info(f"Registro creado en {model} con ID: {record_id}")
+            record_id = self._execute_kw(model, 'create', [data])
+            self.logger.debug("Registro creado en %s con ID: %s", model, record_id)
             return record_id
         except Exception as e:
             self.logger.error(f"Error creando registro en {model}: {e}")
             return None
     
+    def create_records(self, model: str, vals_list: List[Dict]) -> List[int]:
+        """Crear varios registros de un modelo en una sola llamada XML-RPC"""
+        if not vals_list:
+            return []
+        try:
+            self._ensure_auth()
+
+            record_ids = self._execute_kw(model, 'create', [vals_list])
+            self.logger.info(f"{len(record_ids)} registros creados en {model}")
+            return record_ids
+        except Exception as e:
+            self.logger.error(f"Error creando registros en lote en {model}: {e}")
+            return []
+
     def update_record(self, model: str, record_id: int, data: Dict) -> bool:
         """Actualizar un registro en Odoo"""
         try:
-            if not self.uid:
-                self.authenticate()
+            self._ensure_auth()
             
-            result = self.models.execute_kw(
-                self.db, self.uid, self.api_key,
-                model, 'write', [[record_id], data]
-            )
-            self.logger.info(f"Registro {record_id} actualizado en {model}")
+            result = self._execute_kw(model, 'write', [[record_id], data])
+            self.logger.debug("Registro %s actualizado en %s", record_id, model)
             return result
         except Exception as e:
             self.logger.error(f"Error actualizando registro {record_id} en {model}: {e}")
@@ -65,41 +163,48 @@ class OdooClient:
     def search_records(self, model: str, domain: List = None, fields: List = None, limit: int = None) -> List[Dict]:
         """Buscar registros en Odoo"""
         try:
-            if not self.uid:
-                self.authenticate()
+            self._ensure_auth()
             
             domain = domain or []
-            
-            # Buscar IDs
-            record_ids = self.models.execute_kw(
-                self.db, self.uid, self.api_key,
-                model, 'search', [domain],
-                {'limit': limit} if limit else {}
-            )
-            
-            if not record_ids:
-                return []
-            
-            # Leer registros
-            records = self.models.execute_kw(
-                self.db, self.uid, self.api_key,
-                model, 'read', [record_ids],
-                {'fields': fields} if fields else {}
-            )
-            
-            return records
+
+            # search_read combina search + read en una sola llamada
+            options = {}
+            if fields:
+                options['fields'] = fields
+            if limit:
+                options['limit'] = limit
+
+            return self._execute_kw(model, 'search_read', [domain], options)
         except Exception as e:
             self.logger.error(f"Error buscando registros en {model}: {e}")
             return []
     
+    def count_records(self, model: str, domain: List = None) -> int:
+        """Contar registros sin transferirlos (search_count devuelve solo un entero)"""
+        try:
+            self._ensure_auth()
+
+            return self._execute_kw(model, 'search_count', [domain or []])
+        except Exception as e:
+            self.logger.error(f"Error contando registros en {model}: {e}")
+            return 0
+
     def get_record_by_external_id(self, model: str, external_id: str) -> Optional[Dict]:
         """Buscar registro por ID externo (referencia de WooCommerce)"""
+        cache_key = (model, external_id)
+        cached = self._external_id_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
         records = self.search_records(
-            model, 
-            [['x_woo_id', '=', external_id]], 
+            model,
+            [['x_woo_id', '=', external_id]],
             limit=1
         )
-        return records[0] if records else None
+        record = records[0] if records else None
+        if record:
+            self._external_id_cache.set(cache_key, record)
+        return record
     
     # Métodos específicos para el negocio
     
@@ -115,9 +220,9 @@ class OdooClient:
         }
         return self.create_record('res.partner', odoo_data)
     
-    def create_product(self, product_data: Dict) -> Optional[int]:
-        """Crear producto/servicio en Odoo"""
-        odoo_data = {
+    def _product_vals(self, product_data: Dict) -> Dict:
+        """Mapear datos de producto WooCommerce a campos de Odoo"""
+        return {
             'name': product_data.get('name'),
             'default_code': product_data.get('sku'),
             'list_price': product_data.get('price', 0),
@@ -129,56 +234,89 @@ class OdooClient:
             'x_persons': product_data.get('persons', 1),
             'description': product_data.get('description', '')
         }
-        return self.create_record('product.product', odoo_data)
+
+    def create_product(self, product_data: Dict) -> Optional[int]:
+        """Crear producto/servicio en Odoo"""
+        return self.create_record('product.product', self._product_vals(product_data))
+
+    def create_products_bulk(self, products: List[Dict]) -> List[int]:
+        """Crear varios productos/servicios en una sola llamada XML-RPC"""
+        return self.create_records('product.product', [self._product_vals(p) for p in products])
     
     def create_sale_order(self, order_data: Dict) -> Optional[int]:
         """Crear orden de venta en Odoo"""
         partner_id = self.get_or_create_customer(order_data.get('customer'))
-        
+
         if not partner_id:
             self.logger.error("No se pudo crear/encontrar cliente")
             return None
-        
-        # Crear orden
+
+        lines = order_data.get('lines', [])
+
+        # Resolver productos existentes en una sola búsqueda
+        woo_ids = [str(line.get('product', {}).get('woo_id')) for line in lines
+                   if line.get('product', {}).get('woo_id')]
+        existing_products = {}
+        if woo_ids:
+            for record in self.search_records(
+                'product.product',
+                [['x_woo_id', 'in', woo_ids]],
+                fields=['x_woo_id']
+            ):
+                existing_products[record['x_woo_id']] = record['id']
+
+        # Construir líneas con comandos one2many (0, 0, vals)
+        order_lines = []
+        for line_data in lines:
+            product_data = line_data.get('product', {})
+            product_id = existing_products.get(str(product_data.get('woo_id')))
+            if not product_id:
+                product_id = self.get_or_create_product(product_data)
+
+            if product_id:
+                order_lines.append((0, 0, {
+                    'product_id': product_id,
+                    'product_uom_qty': line_data.get('quantity', 1),
+                    'price_unit': line_data.get('price', 0)
+                }))
+
+        # Crear orden y líneas en una sola llamada
         order_odoo_data = {
             'partner_id': partner_id,
             'x_woo_order_id': order_data.get('woo_order_id'),
             'origin': f"WooCommerce #{order_data.get('woo_order_id')}",
-            'state': 'draft'
+            'state': 'draft',
+            'order_line': order_lines
         }
-        
-        order_id = self.create_record('sale.order', order_odoo_data)
-        
-        if order_id:
-            # Agregar líneas de orden
-            for line_data in order_data.get('lines', []):
-                product_id = self.get_or_create_product(line_data.get('product'))
-                
-                if product_id:
-                    line_odoo_data = {
-                        'order_id': order_id,
-                        'product_id': product_id,
-                        'product_uom_qty': line_data.get('quantity', 1),
-                        'price_unit': line_data.get('price', 0)
-                    }
-                    self.create_record('sale.order.line', line_odoo_data)
-        
-        return order_id
+
+        return self.create_record('sale.order', order_odoo_data)
     
     def get_or_create_customer(self, customer_data: Dict) -> Optional[int]:
         """Buscar cliente existente o crear uno nuevo"""
+        cache_key = (customer_data.get('email'), customer_data.get('woo_id'))
+        cached = self._customer_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        partner_id = self._resolve_customer(customer_data)
+        if partner_id:
+            self._customer_cache.set(cache_key, partner_id)
+        return partner_id
+
+    def _resolve_customer(self, customer_data: Dict) -> Optional[int]:
+        """Resolver el partner de Odoo para un cliente de WooCommerce"""
         if customer_data.get('woo_id'):
             existing = self.get_record_by_external_id('res.partner', str(customer_data['woo_id']))
             if existing:
                 return existing['id']
-        
+
         # Buscar por email
         existing = self.search_records(
             'res.partner',
             [['email', '=', customer_data.get('email')]],
             limit=1
         )
-        
+
         if existing:
             # Actualizar con WooCommerce ID si no lo tiene
             if customer_data.get('woo_id'):
@@ -186,7 +324,7 @@ class OdooClient:
                     'x_woo_id': customer_data['woo_id']
                 })
             return existing[0]['id']
-        
+
         # Crear nuevo cliente
         return self.create_customer(customer_data)
     
@@ -196,6 +334,54 @@ class OdooClient:
             existing = self.get_record_by_external_id('product.product', str(product_data['woo_id']))
             if existing:
                 return existing['id']
-        
+
         # Crear nuevo producto
-        return self.create_product(product_data)
\ No newline at end of file
+        return self.create_product(product_data)
+
+class OdooJsonRpcClient(OdooClient):
+    """OdooClient sobre el endpoint /jsonrpc en lugar de XML-RPC.
+
+    El marshalling JSON (orjson) es mucho más barato que construir/parsear
+    árboles XML, especialmente en los search_read grandes. La autenticación
+    sigue usando el proxy XML-RPC de common; solo cambia el transporte de
+    las llamadas a modelos.
+    """
+
+    def __init__(self, session: requests.Session = None):
+        super().__init__()
+        self._jsonrpc_url = f'{self.url}/jsonrpc'
+        self._rpc_ids = itertools.count(1)
+
+        # Sesión keep-alive compartible (mismo patrón que WooCommerceClient)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+        self._session = session
+
+    def _execute_kw(self, model: str, method: str, args: List, kwargs: Dict = None):
+        """Ejecutar un método de modelo vía JSON-RPC"""
+        payload = orjson.dumps({
+            'jsonrpc': '2.0',
+            'method': 'call',
+            'params': {
+                'service': 'object',
+                'method': 'execute_kw',
+                'args': [self.db, self.uid, self.api_key, model, method, args, kwargs or {}],
+            },
+            'id': next(self._rpc_ids),
+        })
+        response = self._session.post(
+            self._jsonrpc_url,
+            data=payload,
+            headers={'Content-Type': 'application/json'},
+            timeout=30
+        )
+        response.raise_for_status()
+
+        reply = orjson.loads(response.content)
+        if reply.get('error'):
+            # Mismo contrato que XML-RPC: los métodos públicos capturan y loggean
+            raise RuntimeError(reply['error'].get('message', 'Error JSON-RPC en Odoo'))
+        return reply.get('result')
\ No newline at end of file
@@ -1,57 +1,92 @@
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPBasicAuth
+from urllib3.util.retry import Retry
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional
 from config import Config
 
 class WooCommerceClient:
-    def __init__(self):
+    def __init__(self, session: requests.Session = None):
         self.base_url = Config.WOO_URL.rstrip('/')
         self.api_url = f"{self.base_url}/wp-json/wc/v3"
         self.consumer_key = Config.WOO_CONSUMER_KEY
         self.consumer_secret = Config.WOO_CONSUMER_SECRET
         self.auth = HTTPBasicAuth(self.consumer_key, self.consumer_secret)
         self.logger = logging.getLogger(__name__)
-        
-    def _make_request(self, method: str, endpoint: str, data: Dict = None, params: Dict = None) -> Optional[Dict]:
-        """Realizar petición HTTP a WooCommerce API"""
+
+        # Sesión con pool de conexiones keep-alive y reintentos; se puede
+        # inyectar una sesión compartida para reutilizar el mismo pool
+        self.session = session or self._build_session()
+        self.session.auth = self.auth
+        # Los cuerpos se serializan con orjson, no con el json= de requests
+        self.session.headers['Content-Type'] = 'application/json'
+
+        # Cache de IDs de productos booking (se resuelve una sola vez)
+        self._booking_product_ids = None
+
+    @staticmethod
+    def _build_session() -> requests.Session:
+        """Crear una sesión con pool keep-alive y política de reintentos"""
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=10,
+            pool_maxsize=50,
+            max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504])
+        )
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def _request_response(self, method: str, endpoint: str, data: Dict = None,
+                          params: Dict = None) -> Optional[requests.Response]:
+        """Realizar petición HTTP a WooCommerce API y devolver la respuesta cruda"""
         url = f"{self.api_url}/{endpoint.lstrip('/')}"
-        
+
         try:
-            response = requests.request(
+            response = self.session.request(
                 method=method,
                 url=url,
-                auth=self.auth,
-                json=data if data else None,
+                data=orjson.dumps(data) if data else None,
                 params=params if params else None,
                 timeout=30
             )
-            
+
             if response.status_code in [200, 201]:
-                return response.json()
+                return response
             else:
                 self.logger.error(f"Error en WooCommerce API: {response.status_code} - {response.text}")
                 return None
-                
+
         except requests.exceptions.RequestException as e:
             self.logger.error(f"Error de conexión con WooCommerce: {e}")
             return None
+
+    def _make_request(self, method: str, endpoint: str, data: Dict = None, params: Dict = None) -> Optional[Dict]:
+        """Realizar petición HTTP a WooCommerce API"""
+        response = self._request_response(method, endpoint, data=data, params=params)
+        # orjson parsea los bytes crudos bastante más rápido que response.json()
+        return orjson.loads(response.content) if response is not None else None
     
-    def get_orders(self, status: str = None, per_page: int = 100, page: int = 1, 
-                   after: str = None, before: str = None) -> List[Dict]:
+    def get_orders(self, status: str = None, per_page: int = 100, page: int = 1,
+                   after: str = None, before: str = None, product: int = None) -> List[Dict]:
         """Obtener órdenes de WooCommerce"""
         params = {
             'per_page': per_page,
             'page': page
         }
-        
+
         if status:
             params['status'] = status
         if after:
             params['after'] = after
         if before:
             params['before'] = before
-            
+        if product:
+            params['product'] = product
+
         response = self._make_request('GET', 'orders', params=params)
         return response if isinstance(response, list) else []
     
@@ -87,6 +122,22 @@ class WooCommerceClient:
     def update_product(self, product_id: int, data: Dict) -> Optional[Dict]:
         """Actualizar producto"""
         return self._make_request('PUT', f'products/{product_id}', data=data)
+
+    def batch_update_products(self, updates: List[Dict]) -> List[int]:
+        """Actualizar productos en lotes de 100 vía /products/batch.
+
+        Devuelve los IDs confirmados por WooCommerce: los items que vienen
+        con un objeto 'error' en la respuesta del batch no cuentan.
+        """
+        updated_ids = []
+        for start in range(0, len(updates), 100):
+            chunk = updates[start:start + 100]
+            response = self._make_request('POST', 'products/batch', data={'update': chunk})
+            if response:
+                for item in response.get('update', []):
+                    if not item.get('error'):
+                        updated_ids.append(item['id'])
+        return updated_ids
     
     def get_customers(self, per_page: int = 100, page: int = 1) -> List[Dict]:
         """Obtener clientes"""
@@ -111,88 +162,196 @@ class WooCommerceClient:
         return self._make_request('PUT', f'customers/{customer_id}', data=data)
     
     # Métodos específicos para booking
-    
+
+    # Por encima de este límite, filtrar órdenes producto por producto cuesta
+    # más round-trips que un solo escaneo completo con filtrado en cliente
+    _MAX_PRODUCT_FILTER_SCANS = 10
+
+    def get_booking_product_ids(self) -> List[int]:
+        """Obtener (y cachear) los IDs de productos tipo booking (todas las páginas)"""
+        if self._booking_product_ids is None:
+            params = {'type': 'booking', 'per_page': 100, 'page': 1}
+            response = self._request_response('GET', 'products', params=params)
+            if response is None:
+                # No cachear un fallo: la próxima llamada reintenta
+                return []
+
+            first_page = orjson.loads(response.content)
+            if not isinstance(first_page, list):
+                return []
+            ids = [p['id'] for p in first_page]
+
+            # Igual que en _iter_order_pages: el header dice cuántas páginas
+            # quedan y las restantes se pueden traer en paralelo
+            total_pages = int(response.headers.get('X-WP-TotalPages', 1))
+            if total_pages > 1:
+                def fetch_page(page):
+                    return self.get_products(type='booking', per_page=100, page=page)
+
+                with ThreadPoolExecutor(max_workers=8) as executor:
+                    for products in executor.map(fetch_page, range(2, total_pages + 1)):
+                        ids.extend(p['id'] for p in products)
+
+            self._booking_product_ids = ids
+        return self._booking_product_ids
+
+    # Meta keys exactas que identifican un item de booking (membership O(1))
+    _BOOKING_META_KEYS = frozenset({
+        '_booking_start', '_booking_end', '_persons',
+        'booking_date', 'booking_duration',
+    })
+
+    def _is_booking_order(self, order: Dict) -> bool:
+        """Verificar si una orden contiene items de booking por su meta_data"""
+        for item in order.get('line_items', []):
+            if any(meta.get('key') in self._BOOKING_META_KEYS
+                   for meta in item.get('meta_data', ())):
+                return True
+        return False
+
+    def _iter_order_pages(self, after: str = None, product: int = None):
+        """Iterar páginas de órdenes completadas, trayendo las restantes en paralelo"""
+        params = {'status': 'completed', 'per_page': 100, 'page': 1}
+        if after:
+            params['after'] = after
+        if product:
+            params['product'] = product
+
+        # Página 1 primero, para conocer el total de páginas por el header
+        response = self._request_response('GET', 'orders', params=params)
+        if response is None:
+            return
+
+        first_page = orjson.loads(response.content)
+        if not isinstance(first_page, list) or not first_page:
+            return
+        yield from first_page
+
+        total_pages = int(response.headers.get('X-WP-TotalPages', 1))
+        if total_pages <= 1:
+            return
+
+        # Las páginas restantes son independientes: traerlas concurrentemente
+        def fetch_page(page):
+            return self.get_orders(status='completed', after=after,
+                                   per_page=100, page=page, product=product)
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            for orders in executor.map(fetch_page, range(2, total_pages + 1)):
+                yield from orders
+
+    def iter_booking_orders(self, after: str = None):
+        """Iterar órdenes con productos booking sin materializar la lista completa"""
+        # Filtrar del lado del servidor por producto booking cuando son pocos,
+        # en lugar de descargar todas las órdenes y descartar la mayoría
+        booking_product_ids = self.get_booking_product_ids()
+        if booking_product_ids and len(booking_product_ids) <= self._MAX_PRODUCT_FILTER_SCANS:
+            seen = set()
+            for product_id in booking_product_ids:
+                for order in self._iter_order_pages(after=after, product=product_id):
+                    if order['id'] not in seen:
+                        seen.add(order['id'])
+                        yield order
+            return
+
+        # Fallback: filtrado en cliente por meta_data de booking (también
+        # cuando hay demasiados productos booking, porque N escaneos
+        # filtrados cuestan más que uno solo completo)
+        for order in self._iter_order_pages(after=after):
+            if self._is_booking_order(order):
+                yield order
+
     def get_booking_orders(self, after: str = None) -> List[Dict]:
         """Obtener órdenes con productos booking"""
-        orders = self.get_orders(status='completed', after=after, per_page=100)
-        booking_orders = []
-        
-        for order in orders:
-            has_booking = False
-            for item in order.get('line_items', []):
-                # Verificar si el item tiene datos de booking
-                meta_data = item.get('meta_data', [])
-                booking_meta = [meta for meta in meta_data if 'booking' in meta.get('key', '').lower()]
-                
-                if booking_meta:
-                    has_booking = True
-                    break
-            
-            if has_booking:
-                booking_orders.append(order)
-        
-        return booking_orders
+        return list(self.iter_booking_orders(after=after))
     
+    # Mapeo exacto de meta keys conocidas -> campo del booking (lookup O(1))
+    _META_KEY_MAP = {
+        'booking_date': 'booking_date',
+        '_booking_start': 'booking_date',
+        'booking_from': 'booking_date',
+        '_booking_from': 'booking_date',
+        'from': 'booking_date',
+        'persons': 'persons',
+        '_persons': 'persons',
+        'person': 'persons',
+        'duration': 'duration',
+        '_duration': 'duration',
+        'booking_duration': 'duration',
+        'to': 'booking_end',
+        'booking_to': 'booking_end',
+        '_booking_end': 'booking_end',
+    }
+
     def extract_booking_data(self, order: Dict) -> List[Dict]:
         """Extraer datos de booking de una orden"""
         bookings = []
-        
+
+        # Bindings locales para el loop caliente (evita lookups repetidos)
+        billing = order['billing']
+        meta_key_map = self._META_KEY_MAP
+        append_booking = bookings.append
+        order_id = order['id']
+        order_number = order['number']
+        customer_id = order['customer_id']
+        date_created = order['date_created']
+
+        customer = {
+            'id': customer_id,
+            'email': billing['email'],
+            'name': f"{billing['first_name']} {billing['last_name']}",
+            'phone': billing['phone']
+        }
+
         for item in order.get('line_items', []):
             booking_data = {
-                'order_id': order['id'],
-                'order_number': order['number'],
+                'order_id': order_id,
+                'order_number': order_number,
                 'product_id': item['product_id'],
                 'product_name': item['name'],
                 'quantity': item['quantity'],
                 'total': float(item['total']),
-                'customer': {
-                    'id': order['customer_id'],
-                    'email': order['billing']['email'],
-                    'name': f"{order['billing']['first_name']} {order['billing']['last_name']}",
-                    'phone': order['billing']['phone']
-                }
+                'customer': customer
             }
-            
-            # Extraer meta data de booking
-            meta_data = item.get('meta_data', [])
-            for meta in meta_data:
-                key = meta.get('key', '').lower()
+
+            # Extraer meta data de booking (lookup exacto, sin escaneos de substring)
+            for meta in item.get('meta_data', ()):
+                attr = meta_key_map.get(meta.get('key', '').lower())
+                if attr is None:
+                    continue
+
                 value = meta.get('value', '')
-                
-                if 'booking_date' in key or 'from' in key:
-                    booking_data['booking_date'] = value
-                elif 'persons' in key or 'person' in key:
-                    booking_data['persons'] = int(value) if str(value).isdigit() else 1
-                elif 'duration' in key:
-                    booking_data['duration'] = value
-                elif 'to' in key and 'booking_date' not in booking_data:
-                    booking_data['booking_end'] = value
-            
+                if attr == 'persons':
+                    # Camino rápido: el valor suele venir ya como entero del JSON
+                    try:
+                        booking_data['persons'] = int(value)
+                    except (TypeError, ValueError):
+                        booking_data['persons'] = 1
+                else:
+                    booking_data[attr] = value
+
             # Si no encontramos fecha, usar fecha de la orden
             if 'booking_date' not in booking_data:
-                booking_data['booking_date'] = order['date_created']
-            
+                booking_data['booking_date'] = date_created
+
             # Asegurar que persons tenga un valor
             if 'persons' not in booking_data:
                 booking_data['persons'] = 1
-            
-            bookings.append(booking_data)
-        
+
+            append_booking(booking_data)
+
         return bookings
     
-    def get_recent_bookings(self, hours: int = 24) -> List[Dict]:
-        """Obtener bookings recientes"""
+    def iter_recent_bookings(self, hours: int = 24):
+        """Iterar bookings recientes booking a booking (memoria constante)"""
         from datetime import datetime, timedelta
-        
+
         # Calcular fecha límite
         after_date = (datetime.now() - timedelta(hours=hours)).isoformat()
-        
-        # Obtener órdenes recientes con bookings
-        orders = self.get_booking_orders(after=after_date)
-        
-        all_bookings = []
-        for order in orders:
-            bookings = self.extract_booking_data(order)
-            all_bookings.extend(bookings)
-        
-        return all_bookings
\ No newline at end of file
+
+        for order in self.iter_booking_orders(after=after_date):
+            yield from self.extract_booking_data(order)
+
+    def get_recent_bookings(self, hours: int = 24) -> List[Dict]:
+        """Obtener bookings recientes"""
+        return list(self.iter_recent_bookings(hours=hours))
\ No newline at end of file
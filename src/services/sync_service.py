@@ -1,77 +1,177 @@
 # src/services/sync_service.py
+import functools
+import hashlib
 import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
-from src.clients.odoo_client import OdooClient
+
+import orjson
+
+from config import Config
+from src.clients.odoo_client import OdooClient, _TTLCache
 from src.clients.woo_client import WooCommerceClient
 
+# Plantillas de dominios Odoo con forma constante: solo la fecha cambia por
+# llamada, así que el resto de las cláusulas no se reconstruye cada vez
+_PRODUCT_SYNC_DOMAIN = (['write_date', '>='], ['sale_ok', '=', True], ['type', '=', 'service'])
+_PRODUCTS_24H_DOMAIN = (['create_date', '>='], ['x_woo_id', '!=', False])
+_ORDERS_24H_DOMAIN = (['create_date', '>='], ['x_woo_order_id', '!=', False])
+
+def _domain_since(template, date: str) -> List:
+    """Instanciar una plantilla de dominio rellenando la cláusula de fecha"""
+    return [template[0] + [date], *(list(clause) for clause in template[1:])]
+
+@functools.lru_cache(maxsize=8)
+def _yesterday_key(minute_bucket: int) -> str:
+    """Fecha 'hace 24 horas' formateada para dominios Odoo.
+
+    Se cachea por minuto (el caller pasa int(time.time() // 60)): dentro del
+    mismo minuto el dominio resultante es idéntico y no hace falta construir
+    datetimes nuevos en cada llamada.
+    """
+    return (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d %H:%M:%S')
+
 class SyncService:
     def __init__(self, odoo_client: OdooClient, woo_client: WooCommerceClient):
         self.odoo = odoo_client
         self.woo = woo_client
         self.logger = logging.getLogger(__name__)
-        
+
+        # Marca de agua de última sincronización, compartida entre los
+        # webhooks y el scheduler para no re-traer órdenes ya vistas
+        self._last_sync_lock = threading.Lock()
+        self._last_sync_ts = time.time() - 2 * 3600
+
+        # Pool reutilizable para trabajo I/O por orden (acotado a la
+        # concurrencia que soportan los workers de Odoo)
+        self._pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix='sync-order')
+
+        # Detección de cambios: hash del último payload enviado a WooCommerce
+        # por producto. Si el payload no cambió, se ahorra el round-trip HTTP.
+        # Se persiste junto a los logs para sobrevivir reinicios del proceso.
+        self._push_hash_path = os.path.join(
+            os.path.dirname(Config.LOG_FILE) or '.', 'woo_push_hashes.json'
+        )
+        self._last_pushed = self._load_push_hashes()
+
+        # WooCommerce reenvía webhooks duplicados con frecuencia: cache TTL de
+        # (order_id -> date_modified) para cortarlos sin ir a Odoo
+        self._recent_orders = _TTLCache(maxsize=10000, ttl=600)
+
+    def _load_push_hashes(self) -> Dict[str, str]:
+        """Cargar los hashes de últimos payloads enviados (vacío si no existen)"""
+        try:
+            with open(self._push_hash_path, 'rb') as fh:
+                return orjson.loads(fh.read())
+        except (OSError, orjson.JSONDecodeError):
+            return {}
+
+    def _save_push_hashes(self) -> None:
+        """Persistir los hashes de últimos payloads enviados"""
+        try:
+            with open(self._push_hash_path, 'wb') as fh:
+                fh.write(orjson.dumps(self._last_pushed))
+        except OSError as e:
+            self.logger.warning("No se pudo persistir el cache de cambios: %s", e)
+
+    @staticmethod
+    def _payload_hash(update_data: Dict) -> str:
+        """Hash corto y estable del payload de actualización (blake2b de 8 bytes)"""
+        serialized = orjson.dumps(update_data, option=orjson.OPT_SORT_KEYS)
+        return hashlib.blake2b(serialized, digest_size=8).hexdigest()
+
+    def _bump_sync_watermark(self, ts: float) -> None:
+        """Avanzar la marca de última sincronización (thread-safe)"""
+        with self._last_sync_lock:
+            if ts > self._last_sync_ts:
+                self._last_sync_ts = ts
+
     def process_woo_order(self, order_data: Dict) -> bool:
         """Procesar orden de WooCommerce y sincronizar con Odoo"""
         try:
             order_id = order_data.get('id')
             order_number = order_data.get('number')
-            
-            self.logger.info(f"Procesando orden WC#{order_number} (ID: {order_id})")
-            
-            # Verificar si la orden ya existe en Odoo
+            date_modified = order_data.get('date_modified')
+
+            # Entrega duplicada del mismo webhook: ya procesamos esta versión
+            # de la orden hace poco, no hace falta ni consultar Odoo
+            if date_modified and self._recent_orders.get(order_id) == date_modified:
+                self.logger.debug("Webhook duplicado para orden %s, ignorado", order_number)
+                return True
+
+            self.logger.info("Procesando orden WC#%s (ID: %s)", order_number, order_id)
+
+            # Verificar si la orden ya existe en Odoo, trayendo de una vez
+            # los campos que usa la actualización (un solo search_read)
             existing_order = self.odoo.search_records(
                 'sale.order',
                 [['x_woo_order_id', '=', str(order_id)]],
+                fields=['state', 'note'],
                 limit=1
             )
-            
+
             if existing_order:
-                self.logger.info(f"Orden {order_number} ya existe en Odoo, actualizando...")
-                return self.update_existing_order(existing_order[0], order_data)
+                self.logger.info("Orden %s ya existe en Odoo, actualizando...", order_number)
+                updated = self.update_existing_order(existing_order[0], order_data)
+                if updated and date_modified:
+                    self._recent_orders.set(order_id, date_modified)
+                return updated
             
             # Extraer datos de booking de la orden
             bookings = self.woo.extract_booking_data(order_data)
             
             if not bookings:
-                self.logger.warning(f"No se encontraron bookings en orden {order_number}")
+                self.logger.warning("No se encontraron bookings en orden %s", order_number)
                 return False
             
-            # Procesar cada booking como producto/servicio
-            success_count = 0
-            for booking in bookings:
-                if self.sync_booking_to_odoo(booking):
-                    success_count += 1
-            
-            # Crear orden de venta en Odoo
+            # Procesar los bookings en lote (una búsqueda + una creación)
+            synced_products = self._sync_bookings_bulk(bookings)
+            success_count = len(synced_products)
+
+            # Crear orden de venta en Odoo reutilizando los IDs ya resueltos
             if success_count > 0:
-                self.create_sale_order_in_odoo(order_data, bookings)
+                self.create_sale_order_in_odoo(order_data, bookings, synced_products)
             
-            self.logger.info(f"Orden {order_number} procesada: {success_count}/{len(bookings)} bookings sincronizados")
+            self.logger.info("Orden %s procesada: %s/%s bookings sincronizados", order_number, success_count, len(bookings))
+
+            if success_count > 0:
+                # Registrar la versión procesada para cortar duplicados. La
+                # marca de agua NO se toca desde los webhooks: llegan fuera de
+                # orden y fallan de forma independiente, así que avanzar aquí
+                # haría que scheduled_sync saltee órdenes anteriores cuyo
+                # webhook se perdió; el cache TTL ya evita el re-proceso
+                if date_modified:
+                    self._recent_orders.set(order_id, date_modified)
+
             return success_count > 0
             
         except Exception as e:
-            self.logger.error(f"Error procesando orden {order_data.get('number', 'unknown')}: {e}")
+            self.logger.error("Error procesando orden %s: %s", order_data.get('number', 'unknown'), e)
             return False
     
-    def sync_booking_to_odoo(self, booking_data: Dict) -> bool:
-        """Sincronizar datos de booking específico con Odoo"""
+    def _build_booking_product_vals(self, booking_data: Dict) -> Optional[Dict]:
+        """Construir los datos de producto/servicio para un booking"""
         try:
-            # Formatear fecha para nombre del producto
+            # Formatear fecha para nombre del producto. El formato de entrada
+            # es ISO fijo ('YYYY-MM-DDTHH:MM:SS[Z]'), así que basta con
+            # slicing en vez de fromisoformat + strftime
             booking_date = booking_data.get('booking_date', '')
-            if isinstance(booking_date, str) and 'T' in booking_date:
-                date_obj = datetime.fromisoformat(booking_date.replace('Z', '+00:00'))
-                formatted_date = date_obj.strftime('%Y-%m-%d %H:%M')
+            if isinstance(booking_date, str) and len(booking_date) >= 16 and booking_date[10] == 'T':
+                formatted_date = f"{booking_date[:10]} {booking_date[11:16]}"
             else:
                 formatted_date = str(booking_date)
-            
+
             # Crear nombre único para el producto/servicio
             product_name = f"{booking_data['product_name']} - {formatted_date}"
             if booking_data.get('persons', 1) > 1:
                 product_name += f" ({booking_data['persons']} personas)"
-            
+
             # Datos del producto/servicio en Odoo
-            product_data = {
+            return {
                 'name': product_name,
                 'sku': f"BOOKING_{booking_data['order_id']}_{booking_data['product_id']}",
                 'price': booking_data['total'],
@@ -80,20 +180,55 @@ class SyncService:
                 'persons': booking_data.get('persons', 1),
                 'description': f"Clase reservada desde WooCommerce\nOrden: #{booking_data['order_number']}\nFecha: {formatted_date}\nPersonas: {booking_data.get('persons', 1)}"
             }
-            
-            # Crear o actualizar producto en Odoo
-            product_id = self.odoo.get_or_create_product(product_data)
-            
-            if product_id:
-                self.logger.info(f"Producto creado/actualizado en Odoo: {product_name}")
-                return True
-            else:
-                self.logger.error(f"Error creando producto en Odoo: {product_name}")
-                return False
-                
         except Exception as e:
-            self.logger.error(f"Error sincronizando booking: {e}")
+            self.logger.error("Error preparando booking: %s", e)
+            return None
+
+    def sync_booking_to_odoo(self, booking_data: Dict) -> bool:
+        """Sincronizar datos de booking específico con Odoo"""
+        product_data = self._build_booking_product_vals(booking_data)
+        if not product_data:
             return False
+
+        # Crear o actualizar producto en Odoo
+        product_id = self.odoo.get_or_create_product(product_data)
+
+        if product_id:
+            # Por item a DEBUG: el resumen agregado sale a INFO en el caller
+            self.logger.debug("Producto creado/actualizado en Odoo: %s", product_data['name'])
+            return True
+        else:
+            self.logger.error("Error creando producto en Odoo: %s", product_data['name'])
+            return False
+
+    def _sync_bookings_bulk(self, bookings: List[Dict]) -> Dict[str, int]:
+        """Sincronizar los bookings de una orden en una sola ronda de RPCs.
+
+        Devuelve {woo_id externo: id de producto en Odoo}, para que el
+        caller pueda reutilizar los IDs sin volver a buscarlos.
+        """
+        product_datas = [vals for vals in
+                         (self._build_booking_product_vals(b) for b in bookings)
+                         if vals]
+        if not product_datas:
+            return {}
+
+        # Resolver productos ya existentes con una sola búsqueda
+        woo_ids = [p['woo_id'] for p in product_datas]
+        product_ids = {record['x_woo_id']: record['id']
+                       for record in self.odoo.search_records(
+                           'product.product',
+                           [['x_woo_id', 'in', woo_ids]],
+                           fields=['x_woo_id']
+                       )}
+
+        # Crear los que falten en una sola llamada
+        to_create = [p for p in product_datas if p['woo_id'] not in product_ids]
+        if to_create:
+            created_ids = self.odoo.create_products_bulk(to_create)
+            product_ids.update(zip((p['woo_id'] for p in to_create), created_ids))
+
+        return product_ids
     
     def process_woo_customer(self, customer_data: Dict) -> bool:
         """Procesar cliente de WooCommerce y sincronizar con Odoo"""
@@ -101,13 +236,14 @@ class SyncService:
             customer_id = customer_data.get('id')
             customer_email = customer_data.get('email')
             
-            self.logger.info(f"Procesando cliente: {customer_email}")
-            
-            # Preparar datos del cliente para Odoo
+            self.logger.info("Procesando cliente: %s", customer_email)
+
+            # Preparar datos del cliente para Odoo (billing se lee una sola vez)
+            billing = customer_data.get('billing') or {}
             odoo_customer_data = {
                 'name': f"{customer_data.get('first_name', '')} {customer_data.get('last_name', '')}".strip(),
                 'email': customer_email,
-                'phone': customer_data.get('billing', {}).get('phone', ''),
+                'phone': billing.get('phone', ''),
                 'woo_id': customer_id
             }
             
@@ -115,26 +251,29 @@ class SyncService:
             partner_id = self.odoo.get_or_create_customer(odoo_customer_data)
             
             if partner_id:
-                self.logger.info(f"Cliente sincronizado con Odoo: {customer_email}")
+                self.logger.info("Cliente sincronizado con Odoo: %s", customer_email)
                 return True
             else:
-                self.logger.error(f"Error sincronizando cliente: {customer_email}")
+                self.logger.error("Error sincronizando cliente: %s", customer_email)
                 return False
                 
         except Exception as e:
-            self.logger.error(f"Error procesando cliente: {e}")
+            self.logger.error("Error procesando cliente: %s", e)
             return False
     
-    def create_sale_order_in_odoo(self, woo_order: Dict, bookings: List[Dict]) -> Optional[int]:
+    def create_sale_order_in_odoo(self, woo_order: Dict, bookings: List[Dict],
+                                  products_by_ext: Dict[str, int] = None) -> Optional[int]:
         """Crear orden de venta en Odoo basada en datos de WooCommerce"""
         try:
-            # Obtener o crear cliente
+            # Obtener o crear cliente (billing se desempaca una sola vez)
+            billing = woo_order.get('billing') or {}
+            customer_id = woo_order.get('customer_id')
             customer_data = {
-                'id': woo_order.get('customer_id'),
-                'email': woo_order.get('billing', {}).get('email'),
-                'name': f"{woo_order.get('billing', {}).get('first_name', '')} {woo_order.get('billing', {}).get('last_name', '')}".strip(),
-                'phone': woo_order.get('billing', {}).get('phone'),
-                'woo_id': woo_order.get('customer_id')
+                'id': customer_id,
+                'email': billing.get('email'),
+                'name': f"{billing.get('first_name', '')} {billing.get('last_name', '')}".strip(),
+                'phone': billing.get('phone'),
+                'woo_id': customer_id
             }
             
             partner_id = self.odoo.get_or_create_customer(customer_data)
@@ -159,29 +298,36 @@ class SyncService:
                 self.logger.error("Error creando orden de venta en Odoo")
                 return None
             
-            # Agregar líneas de la orden
+            # Resolver los productos solo si el caller no trae los IDs
+            # ya calculados por _sync_bookings_bulk
+            if products_by_ext is None:
+                external_ids = [f"{b['order_id']}_{b['product_id']}" for b in bookings]
+                products_by_ext = {record['x_woo_id']: record['id']
+                                   for record in self.odoo.search_records(
+                                       'product.product',
+                                       [['x_woo_id', 'in', external_ids]],
+                                       fields=['x_woo_id']
+                                   )}
+
+            # Crear todas las líneas en una sola llamada
+            line_vals = []
             for booking in bookings:
-                # Buscar el producto correspondiente
-                product_external_id = f"{booking['order_id']}_{booking['product_id']}"
-                product = self.odoo.get_record_by_external_id('product.product', product_external_id)
-                
-                if product:
-                    line_data = {
+                product_id = products_by_ext.get(f"{booking['order_id']}_{booking['product_id']}")
+                if product_id:
+                    line_vals.append({
                         'order_id': order_id,
-                        'product_id': product['id'],
+                        'product_id': product_id,
                         'product_uom_qty': booking.get('quantity', 1),
                         'price_unit': booking.get('total', 0) / booking.get('quantity', 1)
-                    }
-                    
-                    line_id = self.odoo.create_record('sale.order.line', line_data)
-                    if line_id:
-                        self.logger.info(f"Línea de orden creada: {booking['product_name']}")
-            
-            self.logger.info(f"Orden de venta creada en Odoo: {order_id}")
+                    })
+
+            line_ids = self.odoo.create_records('sale.order.line', line_vals)
+
+            self.logger.info("Orden de venta creada en Odoo: %s (%s líneas)", order_id, len(line_ids))
             return order_id
             
         except Exception as e:
-            self.logger.error(f"Error creando orden de venta en Odoo: {e}")
+            self.logger.error("Error creando orden de venta en Odoo: %s", e)
             return None
     
     def update_existing_order(self, existing_order: Dict, woo_order: Dict) -> bool:
@@ -204,33 +350,69 @@ class SyncService:
             result = self.odoo.update_record('sale.order', order_id, update_data)
             
             if result:
-                self.logger.info(f"Orden actualizada en Odoo: {order_id}")
+                self.logger.info("Orden actualizada en Odoo: %s", order_id)
                 return True
             else:
-                self.logger.error(f"Error actualizando orden en Odoo: {order_id}")
+                self.logger.error("Error actualizando orden en Odoo: %s", order_id)
                 return False
                 
         except Exception as e:
-            self.logger.error(f"Error actualizando orden existente: {e}")
+            self.logger.error("Error actualizando orden existente: %s", e)
             return False
     
+    def _sync_order_bookings(self, order: Dict) -> Optional[int]:
+        """Sincronizar en lote los bookings de una orden (worker del scheduler).
+
+        Devuelve la cantidad sincronizada, o None si la orden falló (para
+        distinguirlo de una orden legítimamente sin bookings).
+        """
+        try:
+            return len(self._sync_bookings_bulk(self.woo.extract_booking_data(order)))
+        except Exception as e:
+            self.logger.error("Error sincronizando orden %s: %s", order.get('id'), e)
+            return None
+
     def scheduled_sync(self) -> None:
         """Sincronización programada (ejecutada por scheduler)"""
         try:
             self.logger.info("Iniciando sincronización programada")
-            
-            # Sincronizar bookings de las últimas 2 horas
-            recent_bookings = self.woo.get_recent_bookings(hours=2)
-            
+
+            # Sincronizar solo el delta desde la última sincronización
+            # (los webhooks también avanzan la marca de agua)
+            sync_start = time.time()
+            with self._last_sync_lock:
+                after_date = datetime.fromtimestamp(self._last_sync_ts).isoformat()
+
+            # Cada orden es trabajo I/O independiente: procesarlas en paralelo
+            # sobre el pool persistente (sin crear/destruir hilos por corrida)
+            orders = list(self.woo.iter_booking_orders(after=after_date))
             sync_count = 0
-            for booking in recent_bookings:
-                if self.sync_booking_to_odoo(booking):
-                    sync_count += 1
-            
-            self.logger.info(f"Sincronización programada completada: {sync_count} bookings procesados")
-            
+            failures = 0
+            if orders:
+                futures = [self._pool.submit(self._sync_order_bookings, order)
+                           for order in orders]
+                for future in as_completed(futures):
+                    result = future.result()
+                    if result is None:
+                        failures += 1
+                    else:
+                        sync_count += result
+
+            # Avanzar la marca de agua solo si la pasada fue completa: con
+            # fallos (p. ej. Odoo caído) la próxima corrida debe reintentar
+            # la misma ventana en vez de perderla para siempre
+            if failures:
+                self.logger.warning(
+                    "Sincronización programada: %s órdenes fallaron, la marca de agua no avanza",
+                    failures
+                )
+            else:
+                self._bump_sync_watermark(sync_start)
+
+            self.logger.info("Sincronización programada completada: %s bookings procesados", sync_count)
+
         except Exception as e:
-            self.logger.error(f"Error en sincronización programada: {e}")
+            self.logger.error("Error en sincronización programada: %s", e)
     
     def sync_odoo_to_woo(self) -> None:
         """Sincronización desde Odoo hacia WooCommerce (bidireccional)"""
@@ -241,54 +423,87 @@ class SyncService:
             # o que hayan sido actualizados recientemente
             
             # Obtener productos de Odoo creados/modificados en las últimas 24 horas
-            yesterday = (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d %H:%M:%S')
+            yesterday = _yesterday_key(int(time.time() // 60))
             
             odoo_products = self.odoo.search_records(
                 'product.product',
-                [
-                    ['write_date', '>=', yesterday],
-                    ['sale_ok', '=', True],
-                    ['type', '=', 'service']
-                ],
+                _domain_since(_PRODUCT_SYNC_DOMAIN, yesterday),
                 fields=['name', 'default_code', 'list_price', 'x_woo_id', 'description']
             )
             
-            sync_count = 0
+            # Acumular las actualizaciones y enviarlas por lotes a /products/batch,
+            # saltando los productos cuyo payload no cambió desde el último envío
+            updates = []
             for product in odoo_products:
-                if self.sync_product_to_woo(product):
-                    sync_count += 1
-            
-            self.logger.info(f"Sincronización Odoo → WooCommerce completada: {sync_count} productos procesados")
-            
+                update_data = self._build_woo_product_update(product)
+                if not update_data:
+                    continue
+                payload_hash = self._payload_hash(update_data)
+                if self._last_pushed.get(str(update_data['id'])) == payload_hash:
+                    continue
+                updates.append((update_data, payload_hash))
+
+            sync_count = 0
+            if updates:
+                # Registrar el hash solo de lo que WooCommerce confirmó: un
+                # push fallido debe reintentarse en la próxima corrida
+                updated_ids = set(self.woo.batch_update_products([u for u, _ in updates]))
+                sync_count = len(updated_ids)
+                if updated_ids:
+                    for update_data, payload_hash in updates:
+                        if update_data['id'] in updated_ids:
+                            self._last_pushed[str(update_data['id'])] = payload_hash
+                    self._save_push_hashes()
+
+            self.logger.info("Sincronización Odoo → WooCommerce completada: %s productos procesados", sync_count)
+
         except Exception as e:
-            self.logger.error(f"Error en sincronización Odoo → WooCommerce: {e}")
-    
+            self.logger.error("Error en sincronización Odoo → WooCommerce: %s", e)
+
+    def _build_woo_product_update(self, odoo_product: Dict) -> Optional[Dict]:
+        """Construir el payload de actualización WooCommerce para un producto de Odoo"""
+        woo_id = odoo_product.get('x_woo_id')
+
+        if not woo_id or woo_id == 'False':
+            return None
+
+        try:
+            woo_id = int(woo_id)
+        except (TypeError, ValueError):
+            # IDs externos compuestos (orden_producto) no existen en WooCommerce
+            return None
+
+        return {
+            'id': woo_id,
+            'name': odoo_product['name'],
+            'regular_price': str(odoo_product['list_price']),
+            'description': odoo_product.get('description') or '',
+            'sku': odoo_product.get('default_code') or ''
+        }
+
     def sync_product_to_woo(self, odoo_product: Dict) -> bool:
         """Sincronizar producto de Odoo a WooCommerce"""
         try:
-            # Verificar si el producto ya existe en WooCommerce
-            woo_id = odoo_product.get('x_woo_id')
-            
-            if woo_id and woo_id != 'False':
-                # Actualizar producto existente
-                existing_product = self.woo.get_product(int(woo_id))
-                if existing_product:
-                    update_data = {
-                        'name': odoo_product['name'],
-                        'regular_price': str(odoo_product['list_price']),
-                        'description': odoo_product.get('description', ''),
-                        'sku': odoo_product.get('default_code', '')
-                    }
-                    
-                    result = self.woo.update_product(int(woo_id), update_data)
-                    if result:
-                        self.logger.info(f"Producto actualizado en WooCommerce: {odoo_product['name']}")
-                        return True
-            
+            update_data = self._build_woo_product_update(odoo_product)
+            if not update_data:
+                return False
+
+            # Si el payload es idéntico al último enviado, no hay nada que hacer
+            payload_hash = self._payload_hash(update_data)
+            if self._last_pushed.get(str(update_data['id'])) == payload_hash:
+                return True
+
+            result = self.woo.update_product(update_data['id'], update_data)
+            if result:
+                self._last_pushed[str(update_data['id'])] = payload_hash
+                self._save_push_hashes()
+                self.logger.info("Producto actualizado en WooCommerce: %s", odoo_product['name'])
+                return True
+
             return False
-            
+
         except Exception as e:
-            self.logger.error(f"Error sincronizando producto a WooCommerce: {e}")
+            self.logger.error("Error sincronizando producto a WooCommerce: %s", e)
             return False
     
     def cleanup_logs(self) -> None:
@@ -299,38 +514,33 @@ class SyncService:
             # o hacer mantenimiento de la base de datos si usas una
             
         except Exception as e:
-            self.logger.error(f"Error en limpieza de logs: {e}")
+            self.logger.error("Error en limpieza de logs: %s", e)
     
     def get_sync_statistics(self) -> Dict:
         """Obtener estadísticas de sincronización"""
         try:
             # Contar registros sincronizados en las últimas 24 horas
-            yesterday = (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d %H:%M:%S')
+            yesterday = _yesterday_key(int(time.time() // 60))
             
-            recent_products = self.odoo.search_records(
+            # search_count devuelve solo el entero (no viaja ningún registro)
+            recent_products = self.odoo.count_records(
                 'product.product',
-                [
-                    ['create_date', '>=', yesterday],
-                    ['x_woo_id', '!=', False]
-                ]
+                _domain_since(_PRODUCTS_24H_DOMAIN, yesterday)
             )
-            
-            recent_orders = self.odoo.search_records(
+
+            recent_orders = self.odoo.count_records(
                 'sale.order',
-                [
-                    ['create_date', '>=', yesterday],
-                    ['x_woo_order_id', '!=', False]
-                ]
+                _domain_since(_ORDERS_24H_DOMAIN, yesterday)
             )
-            
+
             return {
-                'products_synced_24h': len(recent_products),
-                'orders_synced_24h': len(recent_orders),
+                'products_synced_24h': recent_products,
+                'orders_synced_24h': recent_orders,
                 'last_check': datetime.now().isoformat()
             }
             
         except Exception as e:
-            self.logger.error(f"Error obteniendo estadísticas: {e}")
+            self.logger.error("Error obteniendo estadísticas: %s", e)
             return {
                 'error': str(e),
                 'last_check': datetime.now().isoformat()
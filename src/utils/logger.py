@@ -1,31 +1,37 @@
 # src/utils/logger.py
+import atexit
 import logging
 import logging.handlers
 import os
-from datetime import datetime
+import queue
+import time
 from config import Config
 
+# Listener que drena la cola de logs (vive todo el proceso)
+_queue_listener = None
+
 def setup_logger():
     """Configurar logging para la aplicación"""
-    
+    global _queue_listener
+
     # Crear directorio de logs si no existe
     log_dir = os.path.dirname(Config.LOG_FILE)
     if log_dir and not os.path.exists(log_dir):
         os.makedirs(log_dir)
-    
+
     # Configurar formato de logs
     log_format = logging.Formatter(
         '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
         datefmt='%Y-%m-%d %H:%M:%S'
     )
-    
+
     # Logger raíz
     root_logger = logging.getLogger()
     root_logger.setLevel(getattr(logging, Config.LOG_LEVEL.upper()))
-    
+
     # Limpiar handlers existentes
     root_logger.handlers.clear()
-    
+
     # Handler para archivo con rotación
     file_handler = logging.handlers.RotatingFileHandler(
         Config.LOG_FILE,
@@ -33,17 +39,26 @@ def setup_logger():
         backupCount=5
     )
     file_handler.setFormatter(log_format)
-    root_logger.addHandler(file_handler)
-    
+
     # Handler para consola
     console_handler = logging.StreamHandler()
     console_handler.setFormatter(log_format)
-    root_logger.addHandler(console_handler)
-    
+
+    # Los workers solo encolan registros; un hilo listener único hace la
+    # escritura a archivo/consola (la rotación no bloquea a los productores)
+    log_queue = queue.Queue(-1)
+    root_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+
+    _queue_listener = logging.handlers.QueueListener(
+        log_queue, file_handler, console_handler, respect_handler_level=True
+    )
+    _queue_listener.start()
+    atexit.register(_queue_listener.stop)
+
     # Logger específico para requests (reducir verbosidad)
     logging.getLogger('requests').setLevel(logging.WARNING)
     logging.getLogger('urllib3').setLevel(logging.WARNING)
-    
+
     logging.info("Sistema de logging configurado correctamente")
 
 class SyncLogger:
@@ -54,65 +69,80 @@ class SyncLogger:
         
     def log_sync_start(self, operation: str, count: int = None):
         """Log inicio de sincronización"""
-        msg = f"Iniciando {operation}"
         if count:
-            msg += f" ({count} items)"
-        self.logger.info(msg)
-    
+            self.logger.info("Iniciando %s (%s items)", operation, count)
+        else:
+            self.logger.info("Iniciando %s", operation)
+
     def log_sync_success(self, operation: str, count: int = None):
         """Log sincronización exitosa"""
-        msg = f"✅ {operation} completado"
         if count:
-            msg += f" ({count} items procesados)"
-        self.logger.info(msg)
-    
+            self.logger.info("✅ %s completado (%s items procesados)", operation, count)
+        else:
+            self.logger.info("✅ %s completado", operation)
+
     def log_sync_error(self, operation: str, error: str):
         """Log error de sincronización"""
-        self.logger.error(f"❌ Error en {operation}: {error}")
-    
+        self.logger.error("❌ Error en %s: %s", operation, error)
+
     def log_item_processed(self, item_type: str, item_id: str, success: bool = True):
         """Log procesamiento de item individual"""
-        status = "✅" if success else "❌"
-        self.logger.info(f"{status} {item_type} {item_id} {'procesado' if success else 'falló'}")
-    
+        if success:
+            self.logger.info("✅ %s %s procesado", item_type, item_id)
+        else:
+            self.logger.info("❌ %s %s falló", item_type, item_id)
+
     def log_webhook_received(self, webhook_type: str, data: dict):
         """Log recepción de webhook"""
-        self.logger.info(f"📥 Webhook recibido: {webhook_type} - {data.get('id', 'unknown')}")
-    
+        self.logger.info("📥 Webhook recibido: %s - %s", webhook_type, data.get('id', 'unknown'))
+
     def log_api_call(self, api: str, endpoint: str, method: str, success: bool = True):
         """Log llamada a API"""
-        status = "✅" if success else "❌"
-        self.logger.debug(f"{status} API {api}: {method} {endpoint}")
+        if self.logger.isEnabledFor(logging.DEBUG):
+            status = "✅" if success else "❌"
+            self.logger.debug("%s API %s: %s %s", status, api, method, endpoint)
 
 def log_function_call(func):
     """Decorador para loggear llamadas a funciones"""
+    # Bajo python -O el wrapper se elimina por completo (costo cero)
+    if not __debug__:
+        return func
+
+    # Resolver el logger una sola vez, en tiempo de decoración
+    logger = logging.getLogger(func.__module__)
+
     def wrapper(*args, **kwargs):
-        logger = logging.getLogger(func.__module__)
-        logger.debug(f"Llamando función: {func.__name__}")
+        enabled = logger.isEnabledFor(logging.DEBUG)
+        if enabled:
+            logger.debug("Llamando función: %s", func.__name__)
         try:
             result = func(*args, **kwargs)
-            logger.debug(f"Función {func.__name__} completada exitosamente")
+            if enabled:
+                logger.debug("Función %s completada exitosamente", func.__name__)
             return result
         except Exception as e:
-            logger.error(f"Error en función {func.__name__}: {e}")
+            logger.error("Error en función %s: %s", func.__name__, e)
             raise
     return wrapper
 
 def log_performance(operation_name: str):
     """Decorador para medir y loggear performance"""
     def decorator(func):
+        logger = logging.getLogger(func.__module__)
+
         def wrapper(*args, **kwargs):
-            logger = logging.getLogger(func.__module__)
-            start_time = datetime.now()
-            
+            # perf_counter: reloj monotónico de alta resolución, mucho más
+            # barato que construir dos datetime y restar
+            start_time = time.perf_counter()
+
             try:
                 result = func(*args, **kwargs)
-                duration = (datetime.now() - start_time).total_seconds()
-                logger.info(f"⏱️ {operation_name} completado en {duration:.2f} segundos")
+                duration = time.perf_counter() - start_time
+                logger.info("⏱️ %s completado en %.2f segundos", operation_name, duration)
                 return result
             except Exception as e:
-                duration = (datetime.now() - start_time).total_seconds()
-                logger.error(f"⏱️ {operation_name} falló después de {duration:.2f} segundos: {e}")
+                duration = time.perf_counter() - start_time
+                logger.error("⏱️ %s falló después de %.2f segundos: %s", operation_name, duration, e)
                 raise
                 
         return wrapper
@@ -4,13 +4,94 @@ Test de Conexiones - WooCommerce-Odoo Booking Sync
 Valida credenciales y conectividad para ambas APIs
 """
 
+import argparse
+import base64
 import os
 import sys
+import threading
+import types
 import xmlrpc.client
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import requests
-from requests.auth import HTTPBasicAuth
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from datetime import datetime
-import json
+from urllib.parse import urlsplit
+
+# orjson parsea los bytes crudos sin el paso de decode UTF-8 de response.json();
+# está pinneado en requirements.txt y el import de los transports de abajo
+# ya lo carga de todos modos
+import orjson
+
+from src.clients.odoo_client import KeepAliveTransport, KeepAliveSafeTransport
+
+# httpx con HTTP/2 multiplexa todas las sondas WooCommerce sobre una sola
+# conexión TLS; es opcional y sin él se usa la sesión requests keep-alive
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+if httpx is not None:
+    _HTTP_ERRORS = (requests.exceptions.RequestException, httpx.HTTPError)
+else:
+    _HTTP_ERRORS = (requests.exceptions.RequestException,)
+
+def normalize_base_url(url):
+    """Validar esquema y host con urlsplit; devuelve la base sin '/' final.
+
+    Un solo parseo reemplaza los chequeos repetidos de startswith y deja la
+    URL lista para concatenar endpoints sin rstrip por llamada.
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', 'https') or not parts.netloc:
+        return None
+    return url.rstrip('/')
+
+def build_http_session(auth=None):
+    """Crear una sesión keep-alive con pool de conexiones para las sondas.
+
+    Reutilizar la misma conexión TCP+TLS evita un handshake por request
+    contra el mismo host (la mayor parte de la latencia de este script).
+    """
+    session = requests.Session()
+    # Sin reintentos automáticos: es un diagnóstico, queremos fallar rápido
+    # en vez de gastar otro presupuesto de timeout en DNS/connect
+    adapter = HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=10,
+        max_retries=Retry(total=0, connect=0, read=0)
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    if auth:
+        session.auth = auth
+    return session
+
+def build_woo_client(auth_header):
+    """Cliente HTTP para las sondas WooCommerce.
+
+    Prefiere httpx con HTTP/2: las sondas paralelas comparten una sola
+    conexión TLS multiplexada (un handshake en vez de uno por socket).
+    Si httpx o el extra http2 (h2) no están instalados, devuelve la sesión
+    requests keep-alive; ambos exponen .get/.head compatibles.
+    """
+    if httpx is not None:
+        try:
+            return httpx.Client(
+                http2=True,
+                # requests sigue redirecciones por defecto; httpx no
+                follow_redirects=True,
+                headers={'Authorization': auth_header},
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+                timeout=httpx.Timeout(10.0, connect=3.0),
+            )
+        except ImportError:
+            # httpx instalado sin h2: seguir con requests
+            pass
+    session = build_http_session()
+    session.headers['Authorization'] = auth_header
+    return session
 
 # Colores para output en terminal
 class Colors:
@@ -21,57 +102,92 @@ class Colors:
     BOLD = '\033[1m'
     END = '\033[0m'
 
+# Prefijos ANSI precomputados: cada helper hace un solo write (atómico y
+# sin reconstruir los fragmentos de color en cada llamada)
+_OK = f"{Colors.GREEN}✅ "
+_ERR = f"{Colors.RED}❌ "
+_WARN = f"{Colors.YELLOW}⚠️  "
+_INFO = f"{Colors.BLUE}ℹ️  "
+_END = Colors.END + "\n"
+_BAR = f"{Colors.BLUE}{Colors.BOLD}{'='*60}{Colors.END}"
+
+# Lock de salida: con los tests corriendo en paralelo evita que las líneas
+# de color de un test se intercalen con las del otro
+_print_lock = threading.Lock()
+
 def print_header(title):
     """Imprime header con formato"""
-    print(f"\n{Colors.BLUE}{Colors.BOLD}{'='*60}{Colors.END}")
-    print(f"{Colors.BLUE}{Colors.BOLD}{title.center(60)}{Colors.END}")
-    print(f"{Colors.BLUE}{Colors.BOLD}{'='*60}{Colors.END}")
+    with _print_lock:
+        sys.stdout.write(f"\n{_BAR}\n{Colors.BLUE}{Colors.BOLD}{title.center(60)}{Colors.END}\n{_BAR}\n")
 
 def print_success(message):
     """Imprime mensaje de éxito"""
-    print(f"{Colors.GREEN}✅ {message}{Colors.END}")
+    with _print_lock:
+        sys.stdout.write(_OK + message + _END)
 
 def print_error(message):
     """Imprime mensaje de error"""
-    print(f"{Colors.RED}❌ {message}{Colors.END}")
+    with _print_lock:
+        sys.stdout.write(_ERR + message + _END)
 
 def print_warning(message):
     """Imprime mensaje de advertencia"""
-    print(f"{Colors.YELLOW}⚠️  {message}{Colors.END}")
+    with _print_lock:
+        sys.stdout.write(_WARN + message + _END)
 
 def print_info(message):
     """Imprime mensaje informativo"""
-    print(f"{Colors.BLUE}ℹ️  {message}{Colors.END}")
+    with _print_lock:
+        sys.stdout.write(_INFO + message + _END)
+
+# Cache del .env parseado, invalidado por mtime: si el script corre en loop
+# (p. ej. como sonda de monitoreo) solo se re-lee el archivo cuando cambia
+_env_cache = {'mtime': None, 'config': None}
 
 def load_env_config():
-    """Carga configuración desde variables de entorno"""
-    # Intentar cargar desde .env si existe
+    """Carga configuración desde variables de entorno.
+
+    El .env se parsea una sola vez y se re-lee únicamente si su mtime
+    cambió; el resultado es un mapping de solo lectura.
+    """
     env_file = '.env'
-    if os.path.exists(env_file):
+    try:
+        mtime = os.stat(env_file).st_mtime_ns
+    except OSError:
+        mtime = None
+
+    if _env_cache['config'] is not None and _env_cache['mtime'] == mtime:
+        return _env_cache['config']
+
+    parsed = {}
+    if mtime is not None:
         print_info(f"Cargando configuración desde {env_file}")
-        with open(env_file, 'r') as f:
+        with open(env_file, 'r', encoding='utf-8') as f:
             for line in f:
-                if line.strip() and not line.startswith('#'):
-                    key, value = line.strip().split('=', 1)
-                    os.environ[key] = value.strip('"').strip("'")
-    
+                line = line.rstrip('\n')
+                if not line or line.startswith('#'):
+                    continue
+                # partition no construye lista ni lanza si falta el '='
+                key, sep, value = line.partition('=')
+                if sep:
+                    parsed[key.strip()] = value.strip().strip('"').strip("'")
+
+    environ = os.environ
     config = {
-        # Odoo
-        'ODOO_URL': os.getenv('ODOO_URL'),
-        'ODOO_DB': os.getenv('ODOO_DB'),
-        'ODOO_USERNAME': os.getenv('ODOO_USERNAME'),
-        'ODOO_API_KEY': os.getenv('ODOO_API_KEY'),
-        
-        # WooCommerce
-        'WOO_URL': os.getenv('WOO_URL'),
-        'WOO_CONSUMER_KEY': os.getenv('WOO_CONSUMER_KEY'),
-        'WOO_CONSUMER_SECRET': os.getenv('WOO_CONSUMER_SECRET'),
-        
-        # Seguridad
-        'WEBHOOK_SECRET': os.getenv('WEBHOOK_SECRET')
+        var: parsed.get(var, environ.get(var))
+        for var in (
+            # Odoo
+            'ODOO_URL', 'ODOO_DB', 'ODOO_USERNAME', 'ODOO_API_KEY',
+            # WooCommerce
+            'WOO_URL', 'WOO_CONSUMER_KEY', 'WOO_CONSUMER_SECRET',
+            # Seguridad
+            'WEBHOOK_SECRET',
+        )
     }
-    
-    return config
+
+    _env_cache['mtime'] = mtime
+    _env_cache['config'] = types.MappingProxyType(config)
+    return _env_cache['config']
 
 def validate_env_variables(config):
     """Valida que todas las variables requeridas estén configuradas"""
@@ -98,7 +214,7 @@ def validate_env_variables(config):
     
     return all_valid
 
-def test_odoo_connection(config):
+def test_odoo_connection(config, verbose=False):
     """Testa conexión con Odoo"""
     print_header("TEST DE CONEXIÓN ODOO")
     
@@ -108,32 +224,55 @@ def test_odoo_connection(config):
         if not url:
             print_error("ODOO_URL no configurada")
             return False
-            
-        if not url.startswith(('http://', 'https://')):
-            print_error("ODOO_URL debe comenzar con http:// o https://")
+
+        url = normalize_base_url(url)
+        if not url:
+            print_error("ODOO_URL debe ser una URL http:// o https:// válida")
             return False
-        
+
         print_info(f"Conectando a: {url}")
-        
-        # Test de conectividad básica
+
+        # Sesión compartida para todas las sondas HTTP contra Odoo
+        session = build_http_session()
+
+        # Test de conectividad básica: HEAD a /web/health responde sin tocar
+        # la base ni renderizar HTML (el selector de bases hace ambas cosas).
+        # En Odoo viejo /web/health no existe; se recurre a /web/login
         try:
-            response = requests.get(f"{url}/web/database/selector", timeout=10)
-            print_success(f"Servidor Odoo alcanzable (Status: {response.status_code})")
+            response = session.head(f"{url}/web/health", timeout=(3, 5), allow_redirects=False)
+            status = response.status_code
+            if status in (404, 405):
+                # Fallback para Odoo viejo o servidores que rechazan HEAD:
+                # GET con stream=True y cierre inmediato lee solo los headers
+                # sin descargar el cuerpo de la página de login
+                with session.get(f"{url}/web/login", stream=True,
+                                 timeout=(3, 5), allow_redirects=False) as resp:
+                    status = resp.status_code
+            print_success(f"Servidor Odoo alcanzable (Status: {status})")
         except requests.exceptions.RequestException as e:
             print_error(f"No se puede alcanzar el servidor Odoo: {e}")
             return False
         
-        # Configurar XML-RPC
-        common = xmlrpc.client.ServerProxy(f'{url}/xmlrpc/2/common')
-        
-        # Test de versión
-        try:
-            version_info = common.version()
-            print_success(f"Versión Odoo: {version_info.get('server_version', 'Desconocida')}")
-        except Exception as e:
-            print_error(f"Error obteniendo versión: {e}")
-            return False
+        # Configurar XML-RPC con transporte keep-alive compartido: /common y
+        # /object viven en el mismo host, así que todas las llamadas reusan
+        # un solo socket TCP+TLS en vez de abrir conexión por llamada
+        if url.startswith('https'):
+            transport = KeepAliveSafeTransport()
+        else:
+            transport = KeepAliveTransport()
+        common = xmlrpc.client.ServerProxy(f'{url}/xmlrpc/2/common', transport=transport)
         
+        # Test de versión (solo con --verbose: es puramente informativo y
+        # authenticate ya valida que el endpoint hable XML-RPC; en el camino
+        # normal nos ahorramos un round-trip completo)
+        if verbose:
+            try:
+                version_info = common.version()
+                print_success(f"Versión Odoo: {version_info.get('server_version', 'Desconocida')}")
+            except Exception as e:
+                print_error(f"Error obteniendo versión: {e}")
+                return False
+
         # Test de autenticación
         try:
             uid = common.authenticate(
@@ -147,7 +286,7 @@ def test_odoo_connection(config):
                 print_success(f"Autenticación exitosa - User ID: {uid}")
                 
                 # Test de permisos - intentar leer modelo res.users
-                models = xmlrpc.client.ServerProxy(f'{url}/xmlrpc/2/object')
+                models = xmlrpc.client.ServerProxy(f'{url}/xmlrpc/2/object', transport=transport)
                 try:
                     user_data = models.execute_kw(
                         config['ODOO_DB'], uid, config['ODOO_API_KEY'],
@@ -156,17 +295,22 @@ def test_odoo_connection(config):
                     )
                     print_success(f"Usuario: {user_data[0]['name']} ({user_data[0]['login']})")
                     
-                    # Test de acceso a modelos críticos
+                    # Test de acceso a modelos críticos: check_access_rights
+                    # consulta las ACL reales sin traer ningún registro
                     critical_models = ['res.partner', 'product.product', 'sale.order']
                     for model in critical_models:
                         try:
-                            models.execute_kw(
+                            can_read = models.execute_kw(
                                 config['ODOO_DB'], uid, config['ODOO_API_KEY'],
-                                model, 'search', [[]], {'limit': 1}
+                                model, 'check_access_rights',
+                                ['read'], {'raise_exception': False}
                             )
-                            print_success(f"Acceso a modelo '{model}': OK")
+                            if can_read:
+                                print_success(f"Acceso a modelo '{model}': OK")
+                            else:
+                                print_error(f"Sin acceso a modelo '{model}'")
                         except Exception as e:
-                            print_error(f"Sin acceso a modelo '{model}': {e}")
+                            print_error(f"Error verificando acceso a '{model}': {e}")
                             
                 except Exception as e:
                     print_error(f"Error verificando permisos: {e}")
@@ -198,29 +342,35 @@ def test_woocommerce_connection(config):
         if not all([url, key, secret]):
             print_error("Credenciales WooCommerce incompletas")
             return False
-        
-        if not url.startswith(('http://', 'https://')):
-            print_error("WOO_URL debe comenzar con http:// o https://")
+
+        url = normalize_base_url(url)
+        if not url:
+            print_error("WOO_URL debe ser una URL http:// o https:// válida")
             return False
-            
+
         print_info(f"Conectando a: {url}")
         
-        # Preparar autenticación
-        auth = HTTPBasicAuth(key, secret)
-        api_base = f"{url.rstrip('/')}/wp-json/wc/v3"
-        
+        # Cliente compartido con el header Authorization precomputado: el hook
+        # de HTTPBasicAuth recalcularía el base64 en cada request
+        token = base64.b64encode(f"{key}:{secret}".encode()).decode()
+        session = build_woo_client(f"Basic {token}")
+        if httpx is not None and isinstance(session, httpx.Client):
+            # httpx no acepta tuplas (connect, read); el default ya viene
+            # configurado en el cliente
+            timeout = httpx.Timeout(10.0, connect=3.0)
+        else:
+            timeout = (3, 10)
+        api_base = f"{url}/wp-json/wc/v3"
+
         # Test de conectividad básica
         try:
-            response = requests.get(f"{url}/wp-json/", timeout=10)
+            response = session.get(f"{url}/wp-json/", timeout=timeout)
             if response.status_code == 200:
                 print_success("WordPress API alcanzable")
                 
                 # Verificar si WooCommerce está activo
-                wp_data = response.json()
-                wc_namespace = any('wc/v3' in ns.get('_links', {}).get('self', [{}])[0].get('href', '') 
-                                for ns in wp_data.get('namespaces', []) if isinstance(ns, dict))
-                
-                if 'wc/v3' in wp_data.get('namespaces', []):
+                wp_data = orjson.loads(response.content)
+                if 'wc/v3' in wp_data.get('namespaces', ()):
                     print_success("WooCommerce API disponible")
                 else:
                     print_warning("WooCommerce API no detectada en namespaces")
@@ -228,19 +378,25 @@ def test_woocommerce_connection(config):
             else:
                 print_warning(f"WordPress responde con status: {response.status_code}")
                 
-        except requests.exceptions.RequestException as e:
+        except _HTTP_ERRORS as e:
             print_error(f"No se puede alcanzar WordPress: {e}")
             return False
         
         # Test de autenticación WC
         try:
-            response = requests.get(f"{api_base}/system_status", auth=auth, timeout=10)
+            # _fields filtra del lado del servidor: system_status completo puede
+            # pesar varios MB y aquí solo se lee settings.version
+            response = session.get(
+                f"{api_base}/system_status",
+                params={'_fields': 'settings'},
+                timeout=timeout
+            )
             
             if response.status_code == 200:
                 print_success("Autenticación WooCommerce exitosa")
                 
                 # Información del sistema
-                system_data = response.json()
+                system_data = orjson.loads(response.content)
                 wc_version = system_data.get('settings', {}).get('version', 'Desconocida')
                 print_success(f"Versión WooCommerce: {wc_version}")
                 
@@ -251,34 +407,42 @@ def test_woocommerce_connection(config):
                     'customers': f"{api_base}/customers"
                 }
                 
-                for name, endpoint in endpoints.items():
-                    try:
-                        resp = requests.get(f"{endpoint}?per_page=1", auth=auth, timeout=10)
-                        if resp.status_code == 200:
-                            data = resp.json()
-                            count = len(data) if isinstance(data, list) else 'N/A'
-                            print_success(f"Endpoint '{name}': OK ({count} registros en muestra)")
-                        else:
-                            print_error(f"Endpoint '{name}': Error {resp.status_code}")
-                    except Exception as e:
-                        print_error(f"Endpoint '{name}': {e}")
+                # Las sondas son independientes: dispararlas en paralelo para
+                # que el tiempo total sea max(RTT) en vez de sum(RTT)
+                def probe_endpoint(endpoint):
+                    return session.get(endpoint, params={'per_page': 1}, timeout=timeout)
+
+                with ThreadPoolExecutor(max_workers=4) as pool:
+                    futures = {pool.submit(probe_endpoint, endpoint): name
+                               for name, endpoint in endpoints.items()}
+                    for future in as_completed(futures):
+                        name = futures[future]
+                        try:
+                            resp = future.result()
+                            if resp.status_code == 200:
+                                data = orjson.loads(resp.content)
+                                count = len(data) if isinstance(data, list) else 'N/A'
+                                print_success(f"Endpoint '{name}': OK ({count} registros en muestra)")
+                            else:
+                                print_error(f"Endpoint '{name}': Error {resp.status_code}")
+                        except Exception as e:
+                            print_error(f"Endpoint '{name}': {e}")
                 
                 # Test específico para YITH Booking
                 print_info("Verificando productos con YITH Booking...")
                 try:
-                    response = requests.get(
-                        f"{api_base}/products", 
-                        auth=auth, 
-                        params={'type': 'booking', 'per_page': 5},
-                        timeout=10
+                    response = session.get(
+                        f"{api_base}/products",
+                        params={'type': 'booking', 'per_page': 1},
+                        timeout=timeout
                     )
-                    
+
                     if response.status_code == 200:
-                        booking_products = response.json()
-                        if booking_products:
-                            print_success(f"Productos booking encontrados: {len(booking_products)}")
-                            for product in booking_products[:3]:  # Mostrar hasta 3
-                                print_info(f"  - {product['name']} (ID: {product['id']})")
+                        # X-WP-Total trae el conteo total sin descargar ni
+                        # parsear los cuerpos de los productos
+                        total = int(response.headers.get('X-WP-Total', 0))
+                        if total:
+                            print_success(f"Productos booking encontrados: {total}")
                         else:
                             print_warning("No se encontraron productos tipo 'booking'")
                     else:
@@ -300,7 +464,7 @@ def test_woocommerce_connection(config):
                 print_error(f"Respuesta: {response.text[:200]}...")
                 return False
                 
-        except requests.exceptions.RequestException as e:
+        except _HTTP_ERRORS as e:
             print_error(f"Error conectando a WooCommerce API: {e}")
             return False
             
@@ -323,7 +487,7 @@ def test_webhook_security(config):
     
     return bool(webhook_secret)
 
-def run_comprehensive_test():
+def run_comprehensive_test(verbose=False):
     """Ejecuta todos los tests"""
     print(f"{Colors.BOLD}🔧 WooCommerce-Odoo Booking Sync - Test de Conexiones{Colors.END}")
     print(f"Timestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
@@ -331,13 +495,17 @@ def run_comprehensive_test():
     # Cargar configuración
     config = load_env_config()
     
-    # Ejecutar tests
-    results = {
-        'env_vars': validate_env_variables(config),
-        'odoo': test_odoo_connection(config),
-        'woocommerce': test_woocommerce_connection(config),
-        'security': test_webhook_security(config)
-    }
+    # Ejecutar tests. Odoo y WooCommerce son hosts distintos sin estado
+    # compartido: correrlos en paralelo deja el total en max(odoo, woo)
+    results = {'env_vars': validate_env_variables(config)}
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        future_odoo = pool.submit(test_odoo_connection, config, verbose=verbose)
+        future_woo = pool.submit(test_woocommerce_connection, config)
+        results['odoo'] = future_odoo.result()
+        results['woocommerce'] = future_woo.result()
+
+    results['security'] = test_webhook_security(config)
     
     # Resumen final
     print_header("RESUMEN DE RESULTADOS")
@@ -368,8 +536,13 @@ def run_comprehensive_test():
     return all_passed
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Test de conexiones WooCommerce-Odoo')
+    parser.add_argument('--verbose', action='store_true',
+                        help='Mostrar información adicional (versión de Odoo)')
+    args = parser.parse_args()
+
     try:
-        success = run_comprehensive_test()
+        success = run_comprehensive_test(verbose=args.verbose)
         sys.exit(0 if success else 1)
     except KeyboardInterrupt:
         print(f"\n{Colors.YELLOW}Test interrumpido por usuario{Colors.END}")